@@ -18,7 +18,7 @@ Usage:
 Define the `output_path` for saving images and a list of `prompts`. Run the script to generate and save images based on each prompt.
 """
 
-from diffusers import UNet2DConditionModel, DiffusionPipeline, LCMScheduler
+from diffusers import UNet2DConditionModel, DiffusionPipeline, LCMScheduler, AutoencoderTiny
 import torch
 import random
 import os
@@ -33,32 +33,58 @@ def sanitize_filename(prompt):
     sanitized = sanitized.replace(' ', '_')
     return sanitized[:50]  # Limit filename length to 50 characters
 
-def generate_images(output_path, prompts, num_images_per_prompt=3):
+def generate_images(output_path, prompts, num_images_per_prompt=3, prompt_batch_size=4, bench_seed=None):
     # Ensure output directory exists
     os.makedirs(output_path, exist_ok=True)
 
+    # Master RNG for drawing per-image seeds; pass bench_seed to reproduce a whole run
+    rng = random.Random(bench_seed)
+
     # Initialize the model
     unet = UNet2DConditionModel.from_pretrained("briaai/BRIA-2.3-FAST", torch_dtype=torch.float16)
     pipe = DiffusionPipeline.from_pretrained("briaai/BRIA-2.3-BETA", unet=unet, torch_dtype=torch.float16)
     pipe.force_zeros_for_empty_prompt = False
     pipe.scheduler = LCMScheduler.from_config(pipe.scheduler.config)
+
+    # Swap the heavy SDXL VAE for the lightweight TAESD autoencoder; at 8-step LCM
+    # generation the VAE decode is a sizable fraction of the wall time
+    pipe.vae = AutoencoderTiny.from_pretrained("madebyollin/taesdxl", torch_dtype=torch.float16)
+
     pipe.to("cuda")  # Ensure the model is moved to GPU
-    
-    for idx, prompt in enumerate(prompts):
+
+    # Compile the UNet and VAE decoder: every call runs the same shapes, so the
+    # one-off compilation cost is amortized across the whole prompt list
+    pipe.unet = torch.compile(pipe.unet, mode="reduce-overhead", fullgraph=False)
+    pipe.vae.decode = torch.compile(pipe.vae.decode, mode="reduce-overhead")
+
+    # Warmup call so compilation happens before the real prompts are generated
+    print("Warming up the pipeline...")
+    pipe("warmup", num_inference_steps=8, guidance_scale=1.0)
+
+    # Generate in prompt batches: one pipe call runs a single batched UNet pass per
+    # step instead of one call (and one pass) per image. Tune prompt_batch_size to VRAM.
+    for batch_start in range(0, len(prompts), prompt_batch_size):
+        batch_prompts = prompts[batch_start:batch_start + prompt_batch_size]
         for i in range(num_images_per_prompt):
-            # Generate a random seed
-            random_seed = random.randint(1, 1000000)
-            torch.manual_seed(random_seed)
-            
-            # Generate image
-            image = pipe(prompt, num_inference_steps=8, guidance_scale=1.0).images[0]
-            
-            # Create filename from prompt and seed
-            filename = f"{idx+1}_{sanitize_filename(prompt)}_seed_{random_seed}.png"
-            image_path = os.path.join(output_path, filename)
-            image.save(image_path)
-            
-            print(f"Generated image for prompt {idx+1}: '{prompt}' with random seed {random_seed}\nSaved as: {filename}\n")
+            # One independent generator (and seed) per batch slot, instead of mutating
+            # the global RNG state with torch.manual_seed
+            seeds = [rng.randint(1, 1000000) for _ in batch_prompts]
+            generators = [torch.Generator(device='cuda').manual_seed(seed) for seed in seeds]
+
+            # Generate one image per prompt in the batch with a single call
+            images = pipe(batch_prompts, num_inference_steps=8, guidance_scale=1.0, generator=generators).images
+
+            for j, (prompt, image, random_seed) in enumerate(zip(batch_prompts, images, seeds)):
+                idx = batch_start + j
+
+                # Create filename from prompt and seed
+                filename = f"{idx+1}_{sanitize_filename(prompt)}_seed_{random_seed}.png"
+                image_path = os.path.join(output_path, filename)
+                # Low compression level: the images feed the RMBG benchmark, so stay
+                # lossless, but don't pay for libpng's default compression effort
+                image.save(image_path, compress_level=1)
+
+                print(f"Generated image for prompt {idx+1}: '{prompt}' with random seed {random_seed}\nSaved as: {filename}\n")
 
 if __name__ == "__main__":
     output_path = "/home/ubuntu/spring/misc/efrat/rmbg/gen_ai_benchmark"  # Directory where images will be saved
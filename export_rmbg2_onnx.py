@@ -0,0 +1,57 @@
+
+
+"""
+This script exports the RMBG-2.0 segmentation model to ONNX so the benchmark can run it
+through ONNX Runtime (or a TensorRT engine built from the same file) instead of PyTorch.
+
+Steps:
+1. Loads the RMBG-2.0 model from the Hugging Face hub.
+2. Wraps it so the exported graph returns only the final mask logits.
+3. Exports to ONNX with a dynamic batch axis, matching the batched benchmark input.
+4. Prints the trtexec command for optionally building a TensorRT engine from the export.
+
+Dependencies:
+- transformers
+- torch
+- onnx
+
+Usage:
+Run the script to produce `rmbg2.onnx` next to the benchmark scripts, then set
+`use_onnx = True` in compare_bria_models.py.
+"""
+
+import torch
+from transformers import AutoModelForImageSegmentation
+
+onnx_model_path = "rmbg2.onnx"
+
+
+class RMBG2Wrapper(torch.nn.Module):
+    """Returns only the final logits so the exported graph has a single output."""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x)[-1]
+
+
+model = AutoModelForImageSegmentation.from_pretrained('briaai/RMBG-2.0', trust_remote_code=True)
+model.eval()
+
+dummy_input = torch.zeros((1, 3, 1024, 1024))
+torch.onnx.export(
+    RMBG2Wrapper(model),
+    dummy_input,
+    onnx_model_path,
+    opset_version=17,
+    input_names=["input"],
+    output_names=["logits"],
+    dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+)
+
+print(f"Exported RMBG-2.0 to {onnx_model_path}")
+print("To build a TensorRT engine from the export, run:")
+print(f"  trtexec --onnx={onnx_model_path} --fp16 --saveEngine=rmbg2.plan "
+      "--minShapes=input:1x3x1024x1024 --optShapes=input:8x3x1024x1024 --maxShapes=input:16x3x1024x1024")